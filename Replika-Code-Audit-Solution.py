@@ -20,8 +20,9 @@
 # - Auxiliar no versionamento e na validação de lógicas complexas.
 #
 # Como Adaptar:
-# A "inteligência" da auditoria reside na função `build_audit_prompt`.
-# Modifique o prompt dentro dessa função para adaptar a ferramenta a
+# A "inteligência" da auditoria reside na função `build_audit_prompt` e nos
+# templates `_SYSTEM_INSTRUCTION`, `_MAIN_TASK_TMPL` e `_OUTPUT_FMT_TMPL`.
+# Modifique esses templates para adaptar a ferramenta a
 # qualquer domínio: auditar C#, Java, verificar padrões de segurança
 # específicos, validar configurações de infraestrutura como código (IaC), etc.
 # -----------------------------------------------------------------------------
@@ -32,15 +33,24 @@ import time
 import logging
 from datetime import datetime
 import re
+import string
 import threading
 import hashlib
+import asyncio
+import json
+import tempfile
+import sqlite3
+import mmap
+import queue
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 
 from PyQt5.QtWidgets import (QApplication, QWidget, QLabel, QPushButton, QVBoxLayout,
-                             QListWidget, QListWidgetItem, QProgressBar, QTextEdit,
+                             QListWidget, QListWidgetItem, QProgressBar, QTextEdit, QPlainTextEdit,
                              QMessageBox, QHBoxLayout, QGroupBox,
                              QSizePolicy, QComboBox, QFileDialog)
-from PyQt5.QtCore import Qt, QObject, pyqtSignal, QRunnable, QThreadPool, QSize, pyqtSlot, QTimer
-from PyQt5.QtGui import QIcon, QDragEnterEvent, QDropEvent, QColor
+from PyQt5.QtCore import Qt, QObject, pyqtSignal, QThread, QSize, pyqtSlot, QTimer
+from PyQt5.QtGui import QIcon, QDragEnterEvent, QDropEvent, QColor, QTextCursor
 
 # --- Constantes de Configuração ---
 APP_VERSION = "2.0-Public-Generic"
@@ -56,11 +66,21 @@ CONFIG = {
     "DEFAULT_MODEL": "gemini-1.5-flash-latest",
     "AUDIT_SUBFOLDER_NAME": "auditoria-codigo",
     "LOG_FILENAME": "code_audit_app.log",
+    "CACHE_DB_PATH": "code_audit_cache.sqlite3", # Cache local de relatórios já gerados
     "APP_ICON_PATH": "app_icon.png", # Crie um ícone 'app_icon.png' ou use o fallback
     "FALLBACK_ICON_PATH": "icon.png", # Ícone de fallback
-    "MAX_THREADS_DIVISOR": 2, # Usa metade dos cores da CPU para processamento paralelo
+    "MAX_INGEST_WORKERS": 8, # Threads usadas para verificar arquivos adicionados à fila (útil em NFS/SMB)
+    # Requisições simultâneas à API Gemini (ajuste conforme o rate limit da sua chave, ou via AUDIT_CONCURRENCY)
+    "MAX_CONCURRENT_REQUESTS": 32,
     "API_TIMEOUT_SECONDS": 400,
+    "MAX_INPUT_CHARS": 700_000, # ~200K tokens; arquivos maiores são recusados antes de chamar a API
+    "BATCH_MIN_FILES": 2, # A partir de quantos prompts agrupados a auditoria usa o Batch Mode da Gemini
+    "BATCH_MAX_SIZE": 16, # Máximo de prompts agrupados em um único job em lote
+    "BATCH_MAX_WAIT_MS": 50, # Tempo máximo de espera para agrupar prompts antes de enviar
+    "BATCH_POLL_INTERVAL_SECONDS": 15, # Intervalo entre consultas ao status do job em lote
     "MAX_FILENAME_LENGTH": 150,
+    "MMAP_THRESHOLD_BYTES": 1 << 20, # Arquivos maiores que isso são lidos via mmap
+    "READ_AHEAD_FILES": 8, # Arquivos lidos antecipadamente pela thread leitora, à espera de uma vaga na API
     "THUMBNAIL_SIZE": QSize(32, 32),
     # Parâmetros da Geração da IA (ajuste para mais criatividade ou mais precisão)
     "DEFAULT_TEMPERATURE": 0.2, # Baixa temperatura para respostas mais factuais e consistentes
@@ -69,6 +89,35 @@ CONFIG = {
     "DEFAULT_MAX_TOKENS": 8192,
 }
 
+# --- Configuração do Logging ---
+# Configurado apenas quando executado como script, antes de qualquer mensagem: assim o
+# primeiro aviso de importação não instala um handler padrão no lugar do arquivo de log.
+logger = logging.getLogger("audit")
+if __name__ == "__main__":
+    logging.basicConfig(
+        filename=CONFIG["LOG_FILENAME"],
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - [%(threadName)s] - %(message)s',
+        encoding='utf-8'
+    )
+    logger.info("--- Aplicação de Auditoria de Código Iniciada (Versão %s) ---", APP_VERSION)
+
+def _concurrency_from_env(default):
+    """Lê AUDIT_CONCURRENCY; valores inválidos voltam ao padrão e o mínimo é 1."""
+    raw = os.environ.get("AUDIT_CONCURRENCY")
+    if raw is None: return default
+    try:
+        value = int(raw)
+    except ValueError:
+        logger.warning("AUDIT_CONCURRENCY inválido (%r); usando %d.", raw, default)
+        return default
+    if value < 1:
+        logger.warning("AUDIT_CONCURRENCY deve ser >= 1 (recebido %d); usando 1.", value)
+        return 1
+    return value
+
+CONFIG["MAX_CONCURRENT_REQUESTS"] = _concurrency_from_env(CONFIG["MAX_CONCURRENT_REQUESTS"])
+
 # --- Verificação de Dependência e Inicialização da IA (Google AI) ---
 GOOGLE_AI_AVAILABLE = False
 try:
@@ -83,17 +132,17 @@ try:
             print("✅ Biblioteca google.generativeai carregada e API Key configurada via variável de ambiente.")
         except Exception as config_e:
             print(f"❌ Erro ao configurar google.generativeai com a API Key: {config_e}")
-            logging.error(f"Erro ao configurar google.generativeai com a API Key: {config_e}")
+            logger.error("Erro ao configurar google.generativeai com a API Key: %s", config_e)
     else:
         print("⚠️ AVISO: A variável de ambiente 'GEMINI_API_KEY' não foi encontrada ou está vazia. Funcionalidade de IA desabilitada.")
-        logging.warning("AVISO: Variável de ambiente GEMINI_API_KEY ausente. IA desabilitada.")
+        logger.warning("AVISO: Variável de ambiente GEMINI_API_KEY ausente. IA desabilitada.")
 except ImportError:
     print("❌ AVISO: Biblioteca 'google-generativeai' não encontrada. Funcionalidade de IA desabilitada.")
     print("   Instale com: pip install google-generativeai")
-    logging.error("Biblioteca google-generativeai não encontrada.")
+    logger.error("Biblioteca google-generativeai não encontrada.")
 except Exception as import_e:
     print(f"❌ Erro inesperado ao importar/configurar google.generativeai: {import_e}")
-    logging.error(f"Erro inesperado ao importar/configurar google.generativeai: {import_e}", exc_info=True)
+    logger.error("Erro inesperado ao importar/configurar google.generativeai: %s", import_e, exc_info=True)
 
 # Fallback para o caso da biblioteca da IA não estar disponível
 if not GOOGLE_AI_AVAILABLE:
@@ -107,105 +156,335 @@ if not GOOGLE_AI_AVAILABLE:
                 return DummyResponse()
     genai = type('DummyGenAIModule', (object,), {'GenerativeModel': DummyGenAI.GenerativeModel, 'configure': DummyGenAI.configure})()
 
-# Colorama para logs coloridos no console
+# SDK novo do Google (google-genai), usado apenas para o Batch Mode em auditorias com vários arquivos
+GEMINI_BATCH_AVAILABLE = False
 try:
-    from colorama import Fore, Style, init
-    init(autoreset=True)
+    from google import genai as google_genai
+    GEMINI_BATCH_AVAILABLE = GOOGLE_AI_AVAILABLE
 except ImportError:
-    # Cria uma classe dummy se colorama não estiver instalado
-    class DummyColor:
-        def __getattr__(self, name): return ""
-    Fore = Style = DummyColor()
+    print("ℹ️ Biblioteca 'google-genai' não encontrada. Auditorias com vários arquivos usarão chamadas individuais.")
+    print("   Instale com: pip install google-genai")
 
-# --- Configuração do Logging ---
-logging.basicConfig(
-    filename=CONFIG["LOG_FILENAME"],
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - [%(threadName)s] - %(message)s',
-    encoding='utf-8'
-)
-logging.info(f"--- Aplicação de Auditoria de Código Iniciada (Versão {APP_VERSION}) ---")
+# Cores ANSI para logs coloridos no console. O colorama só é importado no Windows,
+# onde é preciso habilitar o suporte do console a essas sequências.
+class Fore:
+    RED = "\x1b[31m"
+    GREEN = "\x1b[32m"
+    CYAN = "\x1b[36m"
+
+class Style:
+    RESET_ALL = "\x1b[0m"
+
+if sys.platform == "win32":
+    try:
+        import colorama
+        if hasattr(colorama, "just_fix_windows_console"): colorama.just_fix_windows_console() # colorama >= 0.4.6
+        else: colorama.init()
+    except ImportError:
+        # Sem colorama, consoles antigos do Windows mostrariam as sequências literalmente
+        Fore.RED = Fore.GREEN = Fore.CYAN = Style.RESET_ALL = ""
+
+# --- Expressões Regulares Pré-compiladas ---
+_SANITIZE_BAD = re.compile(r'[\\/*?:"<>|]+')
+_SANITIZE_WS = re.compile(r'\s+')
+_HTML_TITLE = re.compile(r"<title>(.*?)</title>", re.IGNORECASE | re.DOTALL)
+
+# Minúsculas apenas em ASCII: ao contrário de str.lower(), preserva o tamanho do texto
+# (ex.: 'İ'.lower() tem 2 caracteres), então as posições encontradas valem no original
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+# Configuração de geração montada uma única vez a partir das constantes acima
+_GEN_CONFIG = {
+    "temperature": CONFIG["DEFAULT_TEMPERATURE"],
+    "top_p": CONFIG["DEFAULT_TOP_P"],
+    "top_k": CONFIG["DEFAULT_TOP_K"],
+    "max_output_tokens": CONFIG["DEFAULT_MAX_TOKENS"],
+    "response_mime_type": "text/plain",
+}
 
 
 def configure_generation():
     """Retorna o dicionário de configuração para a geração de conteúdo pela IA."""
-    return {
-        "temperature": CONFIG["DEFAULT_TEMPERATURE"],
-        "top_p": CONFIG["DEFAULT_TOP_P"],
-        "top_k": CONFIG["DEFAULT_TOP_K"],
-        "max_output_tokens": CONFIG["DEFAULT_MAX_TOKENS"],
-        "response_mime_type": "text/plain",
-    }
+    return _GEN_CONFIG.copy()
+
+
+# Cache de instâncias de GenerativeModel, compartilhado entre os workers
+_MODEL_CACHE = {}
+_MODEL_LOCK = threading.Lock()
+
+
+def get_cached_model(model_name, generation_config):
+    """Retorna uma instância de GenerativeModel reutilizável para o modelo e a configuração informados."""
+    key = (model_name, tuple(sorted(generation_config.items())))
+    with _MODEL_LOCK:
+        model = _MODEL_CACHE.get(key)
+        if model is None:
+            model = genai.GenerativeModel(model_name=model_name, generation_config=generation_config)
+            _MODEL_CACHE[key] = model
+        return model
 
 
-def send_code_to_gemini(model_name, generation_config, prompt_content):
-    """Envia o prompt para a API Gemini e retorna a resposta."""
+def clear_model_cache():
+    """Descarta as instâncias de modelo em cache (ex: quando o usuário troca de modelo)."""
+    with _MODEL_LOCK:
+        _MODEL_CACHE.clear()
+
+
+async def send_code_to_gemini(model_name, generation_config, prompt_content, on_progress=None, cancel_event=None):
+    """
+    Envia o prompt para a API Gemini (de forma assíncrona) e retorna a resposta.
+
+    A resposta chega em streaming; `on_progress`, se informado, recebe a cada novo
+    trecho o total de caracteres recebidos até o momento e o próprio trecho. Se `cancel_event` for
+    sinalizado, a leitura é interrompida entre um trecho e outro.
+    """
     if not GOOGLE_AI_AVAILABLE:
-        logging.error("Tentativa de chamar send_code_to_gemini sem IA disponível.")
+        logger.error("Tentativa de chamar send_code_to_gemini sem IA disponível.")
         return "Erro: Funcionalidade de IA indisponível. Verifique a instalação e a API Key."
     try:
-        model = genai.GenerativeModel(model_name=model_name, generation_config=generation_config)
-        
-        logging.info(f"Enviando requisição para o modelo {model_name}...")
-        print(f"{Fore.CYAN}Enviando requisição para {model_name}...{Style.RESET_ALL}")
+        model = get_cached_model(model_name, generation_config)
 
-        response = model.generate_content(prompt_content, request_options={'timeout': CONFIG["API_TIMEOUT_SECONDS"]})
+        logger.info("Enviando requisição para o modelo %s...", model_name)
+        print(f"{Fore.CYAN}Enviando requisição para {model_name}...{Style.RESET_ALL}")
 
-        # Extrai o texto da resposta de forma segura
-        response_text = getattr(response, 'text', '').strip()
+        response = await model.generate_content_async(prompt_content, stream=True,
+                                                      request_options={'timeout': CONFIG["API_TIMEOUT_SECONDS"]})
+
+        # Acumula os trechos e junta uma única vez no final; o texto é extraído de forma segura
+        pieces = []
+        received = 0
+        async for chunk in response:
+            if cancel_event is not None and cancel_event.is_set():
+                return "Erro: Auditoria cancelada."
+            text = getattr(chunk, 'text', '')
+            pieces.append(text)
+            received += len(text)
+            if on_progress: on_progress(received, text)
+        response_text = ''.join(pieces).strip()
         if not response_text:
-            logging.warning("API retornou uma resposta vazia.")
+            logger.warning("API retornou uma resposta vazia.")
             return "Erro: A API da IA retornou uma resposta vazia."
 
-        logging.info(f"Resposta recebida ({len(response_text)} caracteres).")
+        logger.info("Resposta recebida (%d caracteres).", len(response_text))
         print(f"{Fore.GREEN}Resposta recebida da Gemini ({len(response_text)} caracteres).{Style.RESET_ALL}")
         return response_text
 
     except (genai.PermissionDenied, google.api_core.exceptions.PermissionDenied) as e:
         emsg = "Erro de Permissão/Autenticação com a API Gemini. A sua API Key é válida e está habilitada?"
-        logging.error(f"{emsg} Detalhe: {e}", exc_info=True)
+        logger.error("%s Detalhe: %s", emsg, e, exc_info=True)
         print(f"{Fore.RED}{emsg}{Style.RESET_ALL}")
         return f"Erro: {emsg}"
     except (genai.DeadlineExceeded, google.api_core.exceptions.DeadlineExceeded) as e:
         emsg = f"Timeout ({CONFIG['API_TIMEOUT_SECONDS']}s) ao contatar a API Gemini. A rede está estável?"
-        logging.error(f"{emsg} Detalhe: {e}", exc_info=True)
+        logger.error("%s Detalhe: %s", emsg, e, exc_info=True)
         print(f"{Fore.RED}{emsg}{Style.RESET_ALL}")
         return f"Erro: {emsg}"
     except Exception as e:
         emsg = f"Erro inesperado ao comunicar com a API: {type(e).__name__}"
-        logging.exception("Erro inesperado em send_code_to_gemini:")
+        logger.exception("Erro inesperado em send_code_to_gemini:")
         print(f"{Fore.RED}{emsg} - {e}{Style.RESET_ALL}")
         return f"Erro: {emsg}"
 
 
+# Cliente único do google-genai: reaproveita o pool de conexões HTTP entre os jobs em lote
+_BATCH_CLIENT = None
+_BATCH_CLIENT_LOCK = threading.Lock()
+
+
+def get_batch_client():
+    """Retorna o cliente do google-genai compartilhado, criando-o na primeira chamada."""
+    global _BATCH_CLIENT
+    with _BATCH_CLIENT_LOCK:
+        if _BATCH_CLIENT is None:
+            _BATCH_CLIENT = google_genai.Client(api_key=CONFIG["API_KEY"])
+        return _BATCH_CLIENT
+
+
+def close_batch_client():
+    """Fecha as conexões do cliente compartilhado (chamado ao encerrar a aplicação)."""
+    global _BATCH_CLIENT
+    with _BATCH_CLIENT_LOCK:
+        client, _BATCH_CLIENT = _BATCH_CLIENT, None
+    close = getattr(client, "close", None)
+    if close: close()
+
+
+def send_batch_to_gemini(model_name, generation_config, keyed_prompts, cancel_event=None):
+    """
+    Envia vários prompts em um único job do Batch Mode da Gemini.
+
+    `keyed_prompts` é uma lista de tuplas (chave, prompt). Retorna um dicionário
+    chave -> texto da resposta; chaves que falharem recebem uma mensagem iniciada por "Erro:".
+    Se `cancel_event` for sinalizado durante a espera, o job é cancelado.
+    """
+    keys = [key for key, _ in keyed_prompts]
+    if not GEMINI_BATCH_AVAILABLE:
+        logger.error("Tentativa de chamar send_batch_to_gemini sem o SDK google-genai disponível.")
+        return dict.fromkeys(keys, "Erro: Batch Mode indisponível. Verifique a instalação do google-genai e a API Key.")
+
+    jsonl_path = None
+    try:
+        client = get_batch_client()
+
+        with tempfile.NamedTemporaryFile("w", suffix=".jsonl", encoding="utf-8", delete=False) as f:
+            jsonl_path = f.name
+            for key, prompt in keyed_prompts:
+                request = {
+                    "contents": [{"role": "user", "parts": [{"text": part} for part in prompt]}],
+                    "generation_config": generation_config,
+                }
+                f.write(json.dumps({"key": key, "request": request}, ensure_ascii=False) + "\n")
+
+        uploaded = client.files.upload(file=jsonl_path, config={"display_name": "auditoria-lote", "mime_type": "jsonl"})
+        job = client.batches.create(model=model_name, src=uploaded.name, config={"display_name": "auditoria-lote"})
+        logger.info("Job em lote %s criado com %d requisições para o modelo %s.", job.name, len(keys), model_name)
+        print(f"{Fore.CYAN}Job em lote enviado para {model_name} ({len(keys)} arquivos)...{Style.RESET_ALL}")
+
+        completed_states = {"JOB_STATE_SUCCEEDED", "JOB_STATE_FAILED", "JOB_STATE_CANCELLED", "JOB_STATE_EXPIRED"}
+        cancel_event = cancel_event or threading.Event()
+        while job.state.name not in completed_states:
+            if cancel_event.wait(CONFIG["BATCH_POLL_INTERVAL_SECONDS"]):
+                client.batches.cancel(name=job.name)
+                logger.info("Job em lote %s cancelado.", job.name)
+                return dict.fromkeys(keys, "Erro: Auditoria cancelada.")
+            job = client.batches.get(name=job.name)
+
+        if job.state.name != "JOB_STATE_SUCCEEDED" or not (job.dest and job.dest.file_name):
+            emsg = f"Job em lote terminou com status {job.state.name}."
+            logger.error(emsg)
+            return dict.fromkeys(keys, f"Erro: {emsg}")
+
+        results = dict.fromkeys(keys, "Erro: O job em lote não retornou resposta para este arquivo.")
+        for line in client.files.download(file=job.dest.file_name).decode("utf-8").splitlines():
+            if not line.strip(): continue
+            entry = json.loads(line)
+            if "response" in entry:
+                parts = entry["response"].get("candidates", [{}])[0].get("content", {}).get("parts", [])
+                response_text = "".join(part.get("text", "") for part in parts).strip()
+                results[entry["key"]] = response_text or "Erro: A API da IA retornou uma resposta vazia."
+            else:
+                results[entry["key"]] = f"Erro: {entry.get('error', 'Falha desconhecida no job em lote.')}"
+
+        logger.info("Job em lote %s concluído.", job.name)
+        print(f"{Fore.GREEN}Job em lote concluído ({len(keys)} arquivos).{Style.RESET_ALL}")
+        return results
+
+    except Exception as e:
+        emsg = f"Erro inesperado no Batch Mode da API: {type(e).__name__}"
+        logger.exception("Erro inesperado em send_batch_to_gemini:")
+        print(f"{Fore.RED}{emsg} - {e}{Style.RESET_ALL}")
+        return dict.fromkeys(keys, f"Erro: {emsg}")
+    finally:
+        if jsonl_path and os.path.exists(jsonl_path):
+            os.remove(jsonl_path)
+
+
 def sanitize_filename(name):
     """Limpa uma string para ser usada como um nome de arquivo seguro."""
     if not name: name = f"audit_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-    name_str = re.sub(r'[\\/*?:"<>|]+', '', str(name))
-    name_str = re.sub(r'\s+', '_', name_str)
+    name_str = _SANITIZE_BAD.sub('', str(name))
+    name_str = _SANITIZE_WS.sub('_', name_str)
     return name_str[:CONFIG["MAX_FILENAME_LENGTH"]]
 
 
 def get_file_metadata(file_path):
     """Extrai metadados e conteúdo de um arquivo de texto."""
     try:
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            content = f.read()
+        # Lê em modo binário uma única vez: o hash é calculado em uma única chamada sobre
+        # os bytes lidos (sem laço em Python) e o texto só é decodificado no final.
+        st = os.stat(file_path)
+        if st.st_size > CONFIG["MMAP_THRESHOLD_BYTES"]:
+            # Arquivos grandes: hash direto sobre o page cache, sem buffer intermediário
+            with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                sha256 = hashlib.sha256(mm)
+                content = mm[:].decode('utf-8', 'ignore')
+        else:
+            with open(file_path, 'rb', buffering=262144) as f:
+                raw = f.read()
+            sha256 = hashlib.sha256(raw)
+            content = raw.decode('utf-8', 'ignore')
         return {
             "full_path": os.path.abspath(file_path),
             "filename": os.path.basename(file_path),
-            "size_bytes": os.path.getsize(file_path),
-            "lines": len(content.splitlines()),
-            "sha256": hashlib.sha256(content.encode('utf-8', 'ignore')).hexdigest(),
-            "modified_time": datetime.fromtimestamp(os.path.getmtime(file_path)).strftime('%Y-%m-%d %H:%M:%S'),
+            "size_bytes": st.st_size,
+            "lines": content.count('\n') + (1 if content and not content.endswith('\n') else 0),
+            "sha256": sha256.hexdigest(),
+            "modified_time": datetime.fromtimestamp(st.st_mtime).strftime('%Y-%m-%d %H:%M:%S'),
             "content_for_prompt": content
         }
     except Exception as e:
-        logging.error(f"Erro ao ler metadados do arquivo {file_path}: {e}", exc_info=True)
+        logger.error("Erro ao ler metadados do arquivo %s: %s", file_path, e, exc_info=True)
         return None
 
+class AuditCache:
+    """
+    Cache persistente (SQLite) de relatórios já gerados.
+
+    A chave combina o SHA256 do arquivo, o nome do arquivo, o modelo, os templates
+    do prompt e os critérios do usuário, então re-auditar um arquivo sem mudanças
+    reaproveita o relatório sem montar o prompt nem chamar a API.
+    """
+    def __init__(self, db_path):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS audits (key TEXT PRIMARY KEY, html BLOB, title TEXT, created REAL)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(file_sha256, model_name, filename, user_prompt_addition):
+        # O conteúdo já está representado pelo SHA256: não é preciso re-hashear o prompt inteiro
+        parts = (file_sha256, model_name, filename, user_prompt_addition)
+        return hashlib.blake2b("\0".join(parts).encode('utf-8') + _PROMPT_TEMPLATES_DIGEST).hexdigest()
+
+    def get(self, key):
+        """Retorna (html, título) do relatório em cache ou None."""
+        try:
+            with self._lock:
+                row = self._conn.execute("SELECT html, title FROM audits WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error as e:
+            logger.warning("Falha ao consultar o cache de auditoria: %s", e)
+            return None
+        return (row[0].decode('utf-8'), row[1]) if row else None
+
+    def put(self, key, html, title):
+        # Uma falha no cache não deve invalidar a auditoria, apenas é registrada no log
+        try:
+            with self._lock:
+                self._conn.execute("INSERT OR REPLACE INTO audits (key, html, title, created) VALUES (?, ?, ?, ?)",
+                                   (key, html.encode('utf-8'), title, time.time()))
+                self._conn.commit()
+        except sqlite3.Error as e:
+            logger.warning("Falha ao gravar no cache de auditoria: %s", e)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+def display_name(file_path):
+    """Nome do arquivo para exibição. Caminhos vindos do Qt usam sempre '/', inclusive no Windows."""
+    return file_path.rpartition('/')[2]
+
+def stat_source_file(file_path):
+    """Confere se o arquivo está acessível. Retorna (caminho, nome, ok) para a fila da GUI."""
+    try:
+        os.stat(file_path)
+        return file_path, display_name(file_path), True
+    except OSError as e:
+        logger.warning("Arquivo inacessível ignorado %s: %s", file_path, e)
+        return file_path, display_name(file_path), False
+
 # --- Componentes da GUI (PyQt5) ---
 
+# Textos e cores de status reutilizados pela janela principal, criados uma única vez
+_MSG_READY = "Pronto para auditar. Adicione arquivos."
+_MSG_PROGRESS = "Processando: {done} de {total}"
+_MSG_DONE = "Análise concluída!"
+_ITEM_DONE = "✅ Concluído"
+_ITEM_ERROR = "❌ Erro"
+_COLOR_DONE = QColor("green")
+_COLOR_ERROR = QColor("red")
+
 class DropArea(QLabel):
     """Área de arrastar e soltar arquivos."""
     dropped_files = pyqtSignal(list)
@@ -236,90 +515,254 @@ class DropArea(QLabel):
         if files: self.dropped_files.emit(files)
 
 
+# --- Templates do Prompt de Auditoria ---
+# Montados uma única vez na importação; `build_audit_prompt` só preenche os campos variáveis.
+_SYSTEM_INSTRUCTION = (
+    "Você é um Auditor de Código Sênior e Analista de Qualidade de Software. Sua tarefa é realizar uma análise crítica e detalhada do código-fonte fornecido, atuando como um revisor técnico (code reviewer) experiente e meticuloso. Seja objetivo, construtivo e preciso."
+)
+
+_MAIN_TASK_TMPL = (
+    "\n--- CÓDIGO-FONTE PARA ANÁLISE ---\n"
+    "Arquivo: `{filename}`\n"
+    "```python\n{content}\n```\n\n"
+    
+    "--- PONTOS DE ANÁLISE OBRIGATÓRIOS ---\n"
+    "Analise o código acima e avalie CADA um dos seguintes pontos. Para cada ponto, forneça um status (Implementado ✅, Parcialmente Implementado ⚠️, Não Implementado ❌, ou Observação ℹ️), uma explicação detalhada e, quando relevante, inclua trechos de código como evidência (escapados para HTML).\n\n"
+    
+    "1.  **Lógica de Negócio e Requisitos 🎯:** O código parece implementar uma lógica clara e coesa? Com base no código, qual parece ser o objetivo principal? Existem partes que parecem confusas, incompletas ou potencialmente incorretas em relação a um objetivo de negócio hipotético?\n\n"
+    
+    "2.  **Qualidade e Boas Práticas (Clean Code) 🧼:** O código é legível e bem estruturado? Avalie o uso de nomes de variáveis e funções, comentários (são úteis ou apenas ruído?), complexidade de funções (são curtas e focadas?), e aderência geral aos princípios do Clean Code e PEP8.\n\n"
+    
+    "3.  **Segurança e Vulnerabilidades 🛡️:** Existem vulnerabilidades de segurança óbvias? Verifique a presença de: \n"
+    "   - Chaves de API, senhas ou outras credenciais 'hardcoded' no código.\n"
+    "   - Falta de validação de entradas (se aplicável).\n"
+    "   - Uso de bibliotecas conhecidamente vulneráveis ou métodos inseguros (ex: `eval()`, `pickle` com dados não confiáveis).\n\n"
+
+    "4.  **Manutenibilidade e Escalabilidade 🏗️:** O código é fácil de manter e modificar? Avalie o nível de acoplamento entre os componentes, a modularidade e se o design permitiria adicionar novas funcionalidades ou escalar o desempenho sem uma refatoração massiva.\n\n"
+    
+    "5.  **Tratamento de Erros e Resiliência 🩹:** Como o código lida com erros e exceções? Existe um tratamento adequado com blocos `try-except`? O logging é utilizado para registrar eventos importantes ou erros? O que aconteceria em um cenário de falha (ex: falha de rede, arquivo não encontrado)?\n\n"
+    
+    "--- ANÁLISE ADICIONAL REQUISITADA PELO USUÁRIO ---\n"
+    "Além da análise padrão, verifique os seguintes pontos específicos solicitados pelo usuário:\n\n"
+    "**Critérios do Usuário:** \"{user}\""
+)
+
+_OUTPUT_FMT_TMPL = (
+    "\n--- FORMATO DE SAÍDA OBRIGATÓRIO: DOCUMENTO HTML5 ---\n"
+    "A sua resposta DEVE ser um ÚNICO bloco ```html ... ``` contendo um documento HTML5 completo e bem formatado. NADA DEVE SER ESCRITO FORA DESTE BLOCO.\n\n"
+    
+    "**Estrutura do HTML:**\n"
+    "1.  **`<head>`:** Inclua `<meta charset=\"UTF-8\">`, um `<title>` informativo como `Relatório de Auditoria: {fn}`, e um `<style>` CSS embutido com um design limpo e profissional (use cores como azul escuro, cinza, e destaques verde/amarelo/vermelho para status).\n"
+    "2.  **`<body>`:**\n"
+    "   - **Cabeçalho:** Título principal como `<h1>Relatório de Auditoria de Código: {fn}</h1>`.\n"
+    "   - **Detalhes do Arquivo:** Uma tabela com os metadados: Nome, Tamanho, Linhas, SHA256, Data da Auditoria.\n"
+    "   - **Sumário Geral:** Um parágrafo resumindo suas conclusões gerais sobre a qualidade do código.\n"
+    "   - **Análise Detalhada:** Crie uma seção (ex: `div` com uma classe `card`) para CADA um dos pontos de análise obrigatórios e para a análise do usuário.\n"
+    "     - Cada seção deve ter um `<h4>` com o título do ponto (ex: `<h4>🎯 Lógica de Negócio</h4>`).\n"
+    "     - Inclua o status com seu emoji correspondente.\n"
+    "     - Forneça sua análise detalhada em parágrafos.\n"
+    "     - Mostre evidências de código dentro de `<pre><code>...</code></pre>`, garantindo que os caracteres HTML como `<` e `>` sejam escapados (`<`, `>`).\n"
+    "   - **Rodapé:** Inclua um rodapé simples com `Gerado por Auditor de Código IA` e o ano."
+)
+
+# Resumo dos templates, calculado uma única vez: alterar os templates invalida o cache de auditoria
+_PROMPT_TEMPLATES_DIGEST = hashlib.blake2b(
+    "\0".join((_SYSTEM_INSTRUCTION, _MAIN_TASK_TMPL, _OUTPUT_FMT_TMPL)).encode('utf-8')
+).digest()
+
+
+# Marca "arquivo ainda não lido": None já significa que a thread leitora tentou e falhou
+_NOT_PRE_READ = object()
+
+# Subpastas de auditoria já criadas nesta sessão (evita um os.makedirs por arquivo)
+_KNOWN_AUDIT_DIRS = set()
+_DIRS_LOCK = threading.Lock()
+
+
+class StatusBuffer:
+    """
+    Guarda o status mais recente de cada arquivo em auditoria.
+
+    Os workers apenas escrevem aqui; a GUI lê tudo de uma vez em intervalos
+    regulares, em vez de receber um sinal por etapa de cada arquivo.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+
+    def set(self, file_path, status):
+        with self._lock:
+            self._pending[file_path] = status
+
+    def discard(self, file_path):
+        with self._lock:
+            self._pending.pop(file_path, None)
+
+    def drain(self):
+        """Retorna e limpa os status acumulados desde a última leitura."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return pending
+
+
+class IngestSignals(QObject):
+    """Sinais emitidos pelas threads que verificam os arquivos adicionados à fila."""
+    file_ingested = pyqtSignal(str, str, bool) # path_original, nome_exibicao, acessivel
+
+
 class WorkerSignals(QObject):
-    """Sinais emitidos por um worker thread."""
-    finished_file = pyqtSignal(str, str, str) # path_original, path_relatorio, titulo_relatorio
-    error_file = pyqtSignal(str, str) # path_original, msg_erro
-    single_file_status = pyqtSignal(str, str) # path_original, status_msg
+    """Sinais emitidos por um worker thread. Os resultados são entregues em lote pelo AuditDispatcher."""
+    response_chunk = pyqtSignal(str, str) # path_original, trecho_da_resposta (apenas com stream_to_log)
 
 
-class AuditWorker(QRunnable):
-    """Worker que executa a auditoria de um único arquivo em uma thread separada."""
-    def __init__(self, file_path, model_name, generation_config, user_prompt_addition):
-        super().__init__()
+class AuditWorker:
+    """Worker que executa a auditoria de um único arquivo no event loop do AuditDispatcher."""
+    def __init__(self, file_path, model_name, generation_config, user_prompt_addition, cache, status_buffer, cancel_event):
         self.signals = WorkerSignals()
+        self.status_buffer = status_buffer
+        self.cancel_event = cancel_event
         self.file_path = file_path
         self.model_name = model_name
         self.generation_config = generation_config
         self.user_prompt_addition = user_prompt_addition
-
-    @pyqtSlot()
-    def run(self):
-        base_filename = os.path.basename(self.file_path)
+        self.stream_to_log = False # Se True, repassa à GUI os trechos da resposta conforme chegam
+        self.cache = cache
+        self.cache_key = None
+        # Derivados do caminho, calculados uma única vez por arquivo
+        self._p = Path(file_path)
+        self._base = self._p.name
+        self._sanitized_stem = sanitize_filename(self._p.stem)
+        self._audit_folder = str(self._p.parent / CONFIG["AUDIT_SUBFOLDER_NAME"])
+
+    async def run(self, batcher, file_meta=_NOT_PRE_READ):
+        """
+        Audita o arquivo e retorna (path_original, path_relatorio, titulo, msg_erro):
+        em caso de sucesso msg_erro é None; em caso de erro os dois campos do meio são None.
+        Retorna None se a auditoria for cancelada.
+        """
         try:
-            self.signals.single_file_status.emit(self.file_path, "Lendo arquivo...")
-            file_meta = get_file_metadata(self.file_path)
-            if not file_meta: raise ValueError("Falha ao ler metadados do arquivo.")
+            # Leitura e gravação de arquivos rodam em threads auxiliares para não bloquear o event loop
+            if self.cancel_event.is_set(): return None
+            file_meta = await asyncio.to_thread(self.load_source, file_meta)
+            cached = await asyncio.to_thread(self.restore_cached_report)
+            if cached:
+                return (self.file_path, *cached, None)
+            if self.cancel_event.is_set(): return None
 
-            self.signals.single_file_status.emit(self.file_path, "Construindo prompt...")
-            prompt = self.build_audit_prompt(file_meta, self.user_prompt_addition)
+            self.status_buffer.set(self.file_path, "Construindo prompt...")
+            prompt = await asyncio.to_thread(self.build_audit_prompt, file_meta, self.user_prompt_addition)
 
-            self.signals.single_file_status.emit(self.file_path, f"Enviando para IA...")
-            ai_response = send_code_to_gemini(self.model_name, self.generation_config, prompt)
-            
-            if not ai_response or ai_response.startswith("Erro:"):
-                raise RuntimeError(f"Falha na API: {ai_response}")
+            self.status_buffer.set(self.file_path, "Enviando para IA...")
+            ai_response = await batcher.submit(self.model_name, self.generation_config, prompt, self.report_progress)
+            return (self.file_path, *await asyncio.to_thread(self.save_report, ai_response), None)
 
-            self.signals.single_file_status.emit(self.file_path, "Gerando relatório...")
-            html_content = self.extract_html_from_markdown(ai_response)
-            if not html_content:
-                raise RuntimeError("A IA não retornou um bloco HTML válido.")
+        except Exception as e:
+            return self.report_error(e)
 
-            report_title = self.extract_title_from_html(html_content) or f"Relatorio_Auditoria_{base_filename}"
-            audit_folder = os.path.join(os.path.dirname(self.file_path), CONFIG["AUDIT_SUBFOLDER_NAME"])
-            os.makedirs(audit_folder, exist_ok=True)
-            
-            ts = datetime.now().strftime('%Y%m%d_%H%M%S')
-            report_filename = f"{sanitize_filename(os.path.splitext(base_filename)[0])}_audit_{ts}.html"
-            report_filepath = os.path.join(audit_folder, report_filename)
+    def load_source(self, file_meta=_NOT_PRE_READ):
+        """Valida o arquivo e calcula a chave de cache; lê o arquivo se os metadados não vierem da thread leitora."""
+        if file_meta is _NOT_PRE_READ:
+            self.status_buffer.set(self.file_path, "Lendo arquivo...")
+            file_meta = get_file_metadata(self.file_path)
+        if not file_meta: raise ValueError("Falha ao ler metadados do arquivo.")
+        # Evita esperar o timeout da API por um arquivo que ela rejeitaria de qualquer forma
+        if not file_meta['content_for_prompt'].strip(): raise ValueError("Arquivo vazio.")
+        if len(file_meta['content_for_prompt']) > CONFIG["MAX_INPUT_CHARS"]:
+            raise ValueError(f"Arquivo excede o limite de contexto ({CONFIG['MAX_INPUT_CHARS']} caracteres).")
+
+        self.cache_key = AuditCache.make_key(file_meta['sha256'], self.model_name, file_meta['filename'], self.user_prompt_addition)
+        return file_meta
+
+    def report_progress(self, received_chars, text):
+        self.status_buffer.set(self.file_path, f"Recebidos {received_chars} caracteres...")
+        if self.stream_to_log and text: self.signals.response_chunk.emit(self.file_path, text)
+
+    def restore_cached_report(self):
+        """Se o relatório já estiver em cache, salva uma cópia e retorna (path_relatorio, titulo)."""
+        cached = self.cache.get(self.cache_key)
+        if not cached: return None
+        self.status_buffer.set(self.file_path, "Relatório em cache...")
+        return self.write_report(*cached)
+
+    def save_report(self, ai_response):
+        """Valida a resposta da IA, guarda o relatório no cache e o salva em disco."""
+        if not ai_response or ai_response.startswith("Erro:"):
+            raise RuntimeError(f"Falha na API: {ai_response}")
+
+        self.status_buffer.set(self.file_path, "Gerando relatório...")
+        html_content = self.extract_html_from_markdown(ai_response)
+        if not html_content:
+            raise RuntimeError("A IA não retornou um bloco HTML válido.")
+
+        report_title = self.extract_title_from_html(html_content) or f"Relatorio_Auditoria_{self._base}"
+        self.cache.put(self.cache_key, html_content, report_title)
+        return self.write_report(html_content, report_title)
+
+    def write_report(self, html_content, report_title):
+        """Grava o relatório HTML na subpasta de auditoria e retorna (path_relatorio, titulo)."""
+        with _DIRS_LOCK:
+            if self._audit_folder not in _KNOWN_AUDIT_DIRS:
+                os.makedirs(self._audit_folder, exist_ok=True)
+                _KNOWN_AUDIT_DIRS.add(self._audit_folder)
+        
+        ts = datetime.now().strftime('%Y%m%d_%H%M%S')
+        report_filename = f"{self._sanitized_stem}_audit_{ts}.html"
+        report_filepath = os.path.join(self._audit_folder, report_filename)
 
-            self.signals.single_file_status.emit(self.file_path, "Salvando...")
-            with open(report_filepath, "w", encoding="utf-8") as f:
-                f.write(html_content)
+        self.status_buffer.set(self.file_path, "Salvando...")
+        with open(report_filepath, "w", encoding="utf-8", buffering=262144) as f:
+            f.write(html_content)
 
-            self.signals.finished_file.emit(self.file_path, report_filepath, report_title)
+        return report_filepath, report_title
 
-        except Exception as e:
-            emsg = f"({type(e).__name__}): {e}"
-            logging.error(f"Erro no worker para {base_filename}: {emsg}", exc_info=True)
-            self.signals.error_file.emit(self.file_path, emsg)
+    def report_error(self, e):
+        emsg = f"({type(e).__name__}): {e}"
+        logger.error("Erro no worker para %s: %s", self._base, emsg, exc_info=True)
+        return (self.file_path, None, None, emsg)
 
-    def extract_html_from_markdown(self, md_text):
+    @staticmethod
+    def extract_html_from_markdown(md_text):
         """Extrai o bloco de código HTML de uma resposta em Markdown."""
-        match = re.search(r"```html\s*(<!DOCTYPE html.*?>.*?</html>)\s*```", md_text, re.IGNORECASE | re.DOTALL)
-        if match: return match.group(1).strip()
+        # Varredura linear com str.find: sem risco de backtracking em respostas longas ou truncadas.
+        # A busca é feita numa cópia com ASCII em minúsculas (aceita ```HTML, ```Html...) e o bloco termina
+        # em </html>, não no primeiro ``` — o relatório pode citar código com ``` dentro do HTML.
+        fence, closing_tag = "```html", "</html>"
+        lowered = md_text.translate(_ASCII_LOWER)
+        start = lowered.find(fence)
+        if start != -1:
+            body_start = start + len(fence)
+            html_end = lowered.find(closing_tag, body_start)
+            if html_end != -1:
+                html_end += len(closing_tag)
+                if lowered.find("```", html_end) != -1:
+                    block = md_text[body_start:html_end].strip()
+                    if block[:14].lower() == "<!doctype html": return block
         if md_text.strip().lower().startswith("<!doctype html"): return md_text.strip()
-        logging.warning("Bloco ```html ... ``` não encontrado na resposta da IA.")
+        logger.warning("Bloco ```html ... ``` não encontrado na resposta da IA.")
         return None
 
-    def extract_title_from_html(self, html_content):
+    @staticmethod
+    def extract_title_from_html(html_content):
         """Extrai o conteúdo da tag <title> do HTML."""
-        match = re.search(r"<title>(.*?)</title>", html_content, re.IGNORECASE | re.DOTALL)
+        match = _HTML_TITLE.search(html_content)
         return match.group(1).strip() if match else None
 
-    def build_audit_prompt(self, file_meta, user_prompt_addition):
+    @staticmethod
+    def build_audit_prompt(file_meta, user_prompt_addition):
         """
         --- 🧠 O CORAÇÃO DA FERRAMENTA: ENGENHARIA DE PROMPT 🧠 ---
 
-        Este método constrói o prompt que será enviado para a IA.
+        Este método constrói o prompt que será enviado para a IA a partir dos
+        templates definidos no nível do módulo (`_SYSTEM_INSTRUCTION`, `_MAIN_TASK_TMPL`
+        e `_OUTPUT_FMT_TMPL`), que são montados uma única vez na importação.
         É aqui que você define a "personalidade" e os objetivos do auditor de IA.
 
         COMO ADAPTAR ESTE PROMPT PARA SUAS NECESSIDADES:
-        1. Mude a Persona: Em `system_instruction`, altere a primeira linha.
+        1. Mude a Persona: Em `_SYSTEM_INSTRUCTION`, altere a primeira linha.
            - Para Java: "Você é um Engenheiro de Software Sênior especialista em Java e no ecossistema Spring."
            - Para Segurança: "Você é um especialista em segurança da informação (AppSec) focado em encontrar vulnerabilidades em código web."
         
-        2. Altere os Pontos de Análise: Modifique os tópicos na seção "PONTOS DE ANÁLISE OBRIGATÓRIOS".
+        2. Altere os Pontos de Análise: Modifique os tópicos na seção "PONTOS DE ANÁLISE OBRIGATÓRIOS" de `_MAIN_TASK_TMPL`.
            - Adicione seus próprios critérios: "5. Conformidade com Padrões Internos: Verifique se o código segue as diretrizes de estilo da 'Empresa X'..."
            - Remova os que não são relevantes.
 
@@ -330,74 +773,240 @@ class AuditWorker(QRunnable):
         qualidade, lógica, segurança e boas práticas.
         """
         
-        system_instruction = (
-            "Você é um Auditor de Código Sênior e Analista de Qualidade de Software. Sua tarefa é realizar uma análise crítica e detalhada do código-fonte fornecido, atuando como um revisor técnico (code reviewer) experiente e meticuloso. Seja objetivo, construtivo e preciso."
-        )
-
-        main_task = (
-            f"\n--- CÓDIGO-FONTE PARA ANÁLISE ---\n"
-            f"Arquivo: `{file_meta['filename']}`\n"
-            f"```python\n{file_meta['content_for_prompt']}\n```\n\n"
-            
-            "--- PONTOS DE ANÁLISE OBRIGATÓRIOS ---\n"
-            "Analise o código acima e avalie CADA um dos seguintes pontos. Para cada ponto, forneça um status (Implementado ✅, Parcialmente Implementado ⚠️, Não Implementado ❌, ou Observação ℹ️), uma explicação detalhada e, quando relevante, inclua trechos de código como evidência (escapados para HTML).\n\n"
-            
-            "1.  **Lógica de Negócio e Requisitos 🎯:** O código parece implementar uma lógica clara e coesa? Com base no código, qual parece ser o objetivo principal? Existem partes que parecem confusas, incompletas ou potencialmente incorretas em relação a um objetivo de negócio hipotético?\n\n"
-            
-            "2.  **Qualidade e Boas Práticas (Clean Code) 🧼:** O código é legível e bem estruturado? Avalie o uso de nomes de variáveis e funções, comentários (são úteis ou apenas ruído?), complexidade de funções (são curtas e focadas?), e aderência geral aos princípios do Clean Code e PEP8.\n\n"
-            
-            "3.  **Segurança e Vulnerabilidades 🛡️:** Existem vulnerabilidades de segurança óbvias? Verifique a presença de: \n"
-            "   - Chaves de API, senhas ou outras credenciais 'hardcoded' no código.\n"
-            "   - Falta de validação de entradas (se aplicável).\n"
-            "   - Uso de bibliotecas conhecidamente vulneráveis ou métodos inseguros (ex: `eval()`, `pickle` com dados não confiáveis).\n\n"
-
-            "4.  **Manutenibilidade e Escalabilidade 🏗️:** O código é fácil de manter e modificar? Avalie o nível de acoplamento entre os componentes, a modularidade e se o design permitiria adicionar novas funcionalidades ou escalar o desempenho sem uma refatoração massiva.\n\n"
-            
-            "5.  **Tratamento de Erros e Resiliência 🩹:** Como o código lida com erros e exceções? Existe um tratamento adequado com blocos `try-except`? O logging é utilizado para registrar eventos importantes ou erros? O que aconteceria em um cenário de falha (ex: falha de rede, arquivo não encontrado)?\n\n"
-            
-            "--- ANÁLISE ADICIONAL REQUISITADA PELO USUÁRIO ---\n"
-            f"Além da análise padrão, verifique os seguintes pontos específicos solicitados pelo usuário:\n\n"
-            f"**Critérios do Usuário:** \"{user_prompt_addition if user_prompt_addition else 'Nenhum critério adicional foi fornecido.'}\""
-        )
-        
-        output_format_instruction = (
-            "\n--- FORMATO DE SAÍDA OBRIGATÓRIO: DOCUMENTO HTML5 ---\n"
-            "A sua resposta DEVE ser um ÚNICO bloco ```html ... ``` contendo um documento HTML5 completo e bem formatado. NADA DEVE SER ESCRITO FORA DESTE BLOCO.\n\n"
-            
-            "**Estrutura do HTML:**\n"
-            "1.  **`<head>`:** Inclua `<meta charset=\"UTF-8\">`, um `<title>` informativo como `Relatório de Auditoria: {fn}`, e um `<style>` CSS embutido com um design limpo e profissional (use cores como azul escuro, cinza, e destaques verde/amarelo/vermelho para status).\n"
-            "2.  **`<body>`:**\n"
-            "   - **Cabeçalho:** Título principal como `<h1>Relatório de Auditoria de Código: {fn}</h1>`.\n"
-            "   - **Detalhes do Arquivo:** Uma tabela com os metadados: Nome, Tamanho, Linhas, SHA256, Data da Auditoria.\n"
-            "   - **Sumário Geral:** Um parágrafo resumindo suas conclusões gerais sobre a qualidade do código.\n"
-            "   - **Análise Detalhada:** Crie uma seção (ex: `div` com uma classe `card`) para CADA um dos pontos de análise obrigatórios e para a análise do usuário.\n"
-            "     - Cada seção deve ter um `<h4>` com o título do ponto (ex: `<h4>🎯 Lógica de Negócio</h4>`).\n"
-            "     - Inclua o status com seu emoji correspondente.\n"
-            "     - Forneça sua análise detalhada em parágrafos.\n"
-            "     - Mostre evidências de código dentro de `<pre><code>...</code></pre>`, garantindo que os caracteres HTML como `<` e `>` sejam escapados (`<`, `>`).\n"
-            "   - **Rodapé:** Inclua um rodapé simples com `Gerado por Auditor de Código IA` e o ano."
-        ).format(fn=file_meta['filename'])
-        
         # O prompt é uma lista de partes, que pode ser mais robusto para modelos multimodais
-        return [system_instruction, main_task, output_format_instruction]
+        return [
+            _SYSTEM_INSTRUCTION,
+            _MAIN_TASK_TMPL.format(
+                filename=file_meta['filename'],
+                content=file_meta['content_for_prompt'],
+                user=user_prompt_addition if user_prompt_addition else 'Nenhum critério adicional foi fornecido.',
+            ),
+            _OUTPUT_FMT_TMPL.format(fn=file_meta['filename']),
+        ]
+
+
+class PromptBatcher:
+    """
+    Agrupa os prompts enviados pelos workers em jobs do Batch Mode da Gemini.
+
+    Os workers chamam `submit` e aguardam a resposta; em segundo plano, o lote é
+    fechado ao atingir `max_batch` prompts ou após `max_wait_ms`. Prompts que
+    ficam sozinhos no lote são enviados diretamente, sem a latência do job em lote.
+    Deve ser usado dentro de um único event loop (o do AuditDispatcher).
+    """
+    def __init__(self, max_batch, max_wait_ms, cancel_event):
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.cancel_event = cancel_event
+        self._queue = asyncio.Queue(maxsize=max_batch)
+        self._loop_task = None
+        self._dispatch_tasks = set()
+
+    async def submit(self, model_name, generation_config, prompt, on_progress=None):
+        """
+        Enfileira um prompt e retorna o texto da resposta (ou uma mensagem iniciada por "Erro:").
+
+        `on_progress` só é chamado quando o prompt é enviado diretamente (em streaming).
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop_task is None:
+            self._loop_task = loop.create_task(self._loop())
+        future = loop.create_future()
+        await self._queue.put((model_name, generation_config, prompt, on_progress, future))
+        return await future
+
+    async def _loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0: break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Um job em lote aceita um único modelo/configuração
+            groups = {}
+            for entry in batch:
+                groups.setdefault((entry[0], tuple(sorted(entry[1].items()))), []).append(entry)
+            for entries in groups.values():
+                task = loop.create_task(self._dispatch(entries))
+                self._dispatch_tasks.add(task)
+                task.add_done_callback(self._dispatch_tasks.discard)
+
+    async def _dispatch(self, entries):
+        model_name, generation_config = entries[0][0], entries[0][1]
+        try:
+            if GEMINI_BATCH_AVAILABLE and len(entries) >= CONFIG["BATCH_MIN_FILES"]:
+                keyed_prompts = [(str(i), prompt) for i, (_, _, prompt, _, _) in enumerate(entries)]
+                responses = await asyncio.to_thread(send_batch_to_gemini, model_name, generation_config,
+                                                    keyed_prompts, self.cancel_event)
+                results = [responses.get(key) for key, _ in keyed_prompts]
+            else:
+                results = await asyncio.gather(*(send_code_to_gemini(model_name, generation_config, prompt, on_progress, self.cancel_event)
+                                                 for _, _, prompt, on_progress, _ in entries))
+        except Exception as e:
+            logger.exception("Erro inesperado ao despachar lote de prompts:")
+            results = [f"Erro: Falha ao despachar o lote ({type(e).__name__})."] * len(entries)
+        for (_, _, _, _, future), result in zip(entries, results):
+            if not future.done(): future.set_result(result)
+
+
+class AuditDispatcher(QThread):
+    """
+    Thread dedicada a um event loop asyncio que executa as auditorias.
+
+    As chamadas à API são limitadas pela rede, não pela CPU: em vez de uma thread
+    por arquivo, um único loop mantém várias requisições em andamento ao mesmo
+    tempo, limitadas por um semáforo.
+
+    Os resultados concluídos na mesma iteração do loop são entregues à GUI juntos
+    por `results_ready`, em listas de até RESULTS_CHUNK_SIZE itens.
+    """
+    RESULTS_CHUNK_SIZE = 32
+    results_ready = pyqtSignal(list) # [(path_original, path_relatorio, titulo, msg_erro), ...]
+
+    def __init__(self, max_concurrency, cancel_event, parent=None):
+        super().__init__(parent)
+        self.max_concurrency = max_concurrency
+        self.cancel_event = cancel_event
+        self._loop = None
+        self._semaphore = None
+        self._batcher = None
+        self._tasks = set()
+        self._results = []
+        self._ready = threading.Event()
+
+    def run(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        # Executor próprio para os asyncio.to_thread das auditorias, dimensionado pela concorrência
+        # de I/O e não pelo número de CPUs (padrão do asyncio); a folga cobre a leitura da fila e os jobs em lote.
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=self.max_concurrency + 4, thread_name_prefix="audit-io"))
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._batcher = PromptBatcher(CONFIG["BATCH_MAX_SIZE"], CONFIG["BATCH_MAX_WAIT_MS"], self.cancel_event)
+        self._loop = loop
+        self._ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            pending = asyncio.all_tasks(loop)
+            for task in pending: task.cancel()
+            loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            loop.close()
+
+    def submit_all(self, workers):
+        """
+        Agenda a auditoria de vários arquivos. Pode ser chamado a partir da thread da GUI.
+
+        Uma thread leitora lê os arquivos em sequência e os entrega por uma fila limitada
+        ao event loop, que só retira o próximo quando há vaga no semáforo: a leitura do
+        disco avança enquanto as requisições anteriores aguardam a rede.
+        """
+        self._ready.wait()
+        read_queue = queue.Queue(maxsize=CONFIG["READ_AHEAD_FILES"])
+        threading.Thread(target=self._reader, args=(list(workers), read_queue), name="audit-reader", daemon=True).start()
+        asyncio.run_coroutine_threadsafe(self._consume(read_queue), self._loop)
+
+    def stop(self):
+        """Encerra o event loop; auditorias ainda em andamento são canceladas."""
+        self._ready.wait()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+    def _reader(self, workers, read_queue):
+        """Produtor: lê cada arquivo e coloca (worker, metadados) na fila; termina com None."""
+        for worker in workers:
+            if self.cancel_event.is_set(): break
+            worker.status_buffer.set(worker.file_path, "Lendo arquivo...")
+            if not self._put(read_queue, (worker, get_file_metadata(worker.file_path))): return
+        self._put(read_queue, None)
+
+    def _put(self, read_queue, item):
+        # put() com timeout para não ficar preso à fila cheia se a aplicação for encerrada
+        while not self.cancel_event.is_set():
+            try:
+                read_queue.put(item, timeout=0.25)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, read_queue):
+        while not self.cancel_event.is_set():
+            try:
+                return read_queue.get(timeout=0.25)
+            except queue.Empty:
+                continue
+        return None
+
+    async def _consume(self, read_queue):
+        """Consumidor: reserva uma vaga no semáforo antes de retirar o próximo arquivo da fila."""
+        while True:
+            await self._semaphore.acquire()
+            item = await asyncio.to_thread(self._get, read_queue)
+            if item is None:
+                self._semaphore.release()
+                return
+            self._spawn(*item)
+
+    def _spawn(self, worker, file_meta):
+        task = self._loop.create_task(self._audit_one(worker, file_meta))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _audit_one(self, worker, file_meta):
+        # A vaga no semáforo já foi reservada por _consume
+        try:
+            outcome = await worker.run(self._batcher, file_meta)
+        finally:
+            self._semaphore.release()
+        if outcome is None: return
+        if not self._results: self._loop.call_soon(self._flush_results)
+        self._results.append(outcome)
+
+    def _flush_results(self):
+        results, self._results = self._results, []
+        for i in range(0, len(results), self.RESULTS_CHUNK_SIZE):
+            self.results_ready.emit(results[i:i + self.RESULTS_CHUNK_SIZE])
 
 
 class MainWindow(QWidget):
     """Janela principal da aplicação."""
+    _PY_ICON = None # Ícone dos itens da fila, carregado do tema uma única vez
+
     def __init__(self):
         super().__init__()
+        if MainWindow._PY_ICON is None:
+            MainWindow._PY_ICON = QIcon.fromTheme("text-x-python")
         self.setWindowTitle(f"🕵️ Auditor de Código IA v{APP_VERSION}")
         self.setGeometry(100, 100, 900, 750)
         self.setWindowIcon(QIcon(CONFIG["APP_ICON_PATH"]))
 
         self.py_file_paths = []
+        self._paths_seen = set() # Caminhos na fila ou em verificação, para deduplicação O(1)
         self.list_item_map = {}
         self.is_processing = False
-        
-        self.thread_pool = QThreadPool.globalInstance()
-        max_threads = max(1, os.cpu_count() // CONFIG["MAX_THREADS_DIVISOR"]) if os.cpu_count() else 2
-        self.thread_pool.setMaxThreadCount(max_threads)
-        logging.info(f"ThreadPool configurado com um máximo de {max_threads} threads.")
+        self._cursor_pushed = False
+        self._file_dialog = None # Diálogo de seleção de arquivos aberto (não modal-bloqueante)
+        self.audit_cache = AuditCache(CONFIG["CACHE_DB_PATH"])
+        self.status_buffer = StatusBuffer()
+
+        # Verificação dos arquivos adicionados roda fora da thread da GUI
+        self._ingest_executor = ThreadPoolExecutor(max_workers=CONFIG["MAX_INGEST_WORKERS"], thread_name_prefix="ingest")
+        self._ingest_signals = IngestSignals()
+        self._pending_ingest = set()
+        self._ingest_batch = [] # (caminho, nome) verificados e ainda não inseridos na lista
+        self._ingested_count = 0
+
+
+        # Sinalizado ao fechar a janela para que as auditorias em andamento terminem logo
+        self.cancel_event = threading.Event()
+        self.dispatcher = AuditDispatcher(CONFIG["MAX_CONCURRENT_REQUESTS"], self.cancel_event)
+        self.dispatcher.start()
+        logger.info("AuditDispatcher configurado com até %d requisições simultâneas.", CONFIG["MAX_CONCURRENT_REQUESTS"])
 
         self._create_widgets()
         self._setup_layout()
@@ -426,13 +1035,42 @@ class MainWindow(QWidget):
         self.clear_button = QPushButton(QIcon.fromTheme("edit-clear"), " Limpar Tudo")
         self.clear_button.setObjectName("ClearButton")
 
-        self.results_area = QTextEdit()
+        # QPlainTextEdit: append sem re-layout do documento inteiro; o limite de blocos descarta as linhas mais antigas
+        self.results_area = QPlainTextEdit()
         self.results_area.setReadOnly(True)
+        self.results_area.setMaximumBlockCount(10000)
         self.results_area.setPlaceholderText("Status e resultados da auditoria aparecerão aqui...")
 
-        self.status_label = QLabel("Pronto para auditar. Adicione arquivos.")
+        self.status_label = QLabel(_MSG_READY)
         self.overall_progress_bar = QProgressBar()
 
+        # Linhas do log acumuladas e inseridas no results_area de uma vez, no máximo a cada 200 ms
+        self._pending_log = []
+        self._log_timer = QTimer(self)
+        self._log_timer.setSingleShot(True)
+        self._log_timer.setInterval(200)
+
+        # Trechos da resposta em streaming (auditoria de um único arquivo), agrupados a cada ~16 ms
+        self._pending_stream = []
+        self._stream_timer = QTimer(self)
+        self._stream_timer.setSingleShot(True)
+        self._stream_timer.setInterval(16)
+
+        # Insere os arquivos verificados na lista em lote, em vez de um addItem por sinal recebido
+        self._ingest_timer = QTimer(self)
+        self._ingest_timer.setSingleShot(True)
+        self._ingest_timer.setInterval(50)
+
+        # Aplica os status dos arquivos em lote, em vez de um sinal por etapa de cada worker
+        self._status_timer = QTimer(self)
+        self._status_timer.setInterval(100)
+
+        # Progresso geral: os workers só atualizam o valor pendente e a barra é redesenhada a ~30 Hz
+        self._pending_progress = 0
+        self._rendered_processed = 0 # Contagem exibida por último no status_label
+        self._progress_timer = QTimer(self)
+        self._progress_timer.setInterval(33)
+
     def _setup_layout(self):
         main_layout = QVBoxLayout(self)
         top_layout = QHBoxLayout()
@@ -470,6 +1108,14 @@ class MainWindow(QWidget):
         self.file_list.itemDoubleClicked.connect(self.remove_file_item)
         self.analyze_button.clicked.connect(self.start_analysis)
         self.clear_button.clicked.connect(self.clear_all)
+        self.model_combo.currentTextChanged.connect(clear_model_cache)
+        self._status_timer.timeout.connect(self.flush_file_statuses)
+        self._progress_timer.timeout.connect(self.flush_progress)
+        self._log_timer.timeout.connect(self.flush_log)
+        self._stream_timer.timeout.connect(self.flush_stream)
+        self._ingest_timer.timeout.connect(self.insert_ingested_files)
+        self._ingest_signals.file_ingested.connect(self.on_file_ingested)
+        self.dispatcher.results_ready.connect(self.on_results_ready)
 
     def apply_styles(self):
         # Estilos podem ser adicionados aqui para melhorar a aparência
@@ -493,29 +1139,67 @@ class MainWindow(QWidget):
                  QMessageBox.warning(self, "Dependência Ausente", msg)
 
     @pyqtSlot(list)
+    @pyqtSlot('QStringList') # QFileDialog.filesSelected
     def add_files_to_list(self, files):
-        count = 0
         for file_path in files:
-            if file_path not in self.py_file_paths:
-                self.py_file_paths.append(file_path)
-                item = QListWidgetItem(QIcon.fromTheme("text-x-python"), os.path.basename(file_path))
+            if file_path in self._paths_seen: continue
+            self._paths_seen.add(file_path)
+            self._pending_ingest.add(file_path)
+            future = self._ingest_executor.submit(stat_source_file, file_path)
+            future.add_done_callback(self._emit_file_ingested)
+
+    def _emit_file_ingested(self, future):
+        # Roda na thread do executor; o sinal entrega o resultado na thread da GUI
+        if future.cancelled(): return
+        self._ingest_signals.file_ingested.emit(*future.result())
+
+    @pyqtSlot(str, str, bool)
+    def on_file_ingested(self, file_path, name, ok):
+        if file_path not in self._pending_ingest: return # Fila limpa enquanto o arquivo era verificado
+        self._pending_ingest.discard(file_path)
+        if ok:
+            self._ingest_batch.append((file_path, name))
+        else:
+            self._paths_seen.discard(file_path)
+            self.append_log(f"⚠️ Arquivo inacessível ignorado: {file_path}")
+        if not self._ingest_timer.isActive(): self._ingest_timer.start()
+
+    @pyqtSlot()
+    def insert_ingested_files(self):
+        batch, self._ingest_batch = self._ingest_batch, []
+        if batch:
+            # Uma única inserção com a atualização visual suspensa, em vez de um repaint por item
+            first_row = self.file_list.count()
+            self.file_list.setUpdatesEnabled(False)
+            self.file_list.blockSignals(True)
+            self.file_list.addItems([name for _, name in batch])
+            for row, (file_path, _) in enumerate(batch, first_row):
+                item = self.file_list.item(row)
+                item.setIcon(MainWindow._PY_ICON)
                 item.setData(Qt.UserRole, file_path)
-                self.file_list.addItem(item)
                 self.list_item_map[file_path] = item
-                count += 1
-        if count > 0:
-            self.analyze_button.setEnabled(True)
-            self.results_area.append(f"ℹ️ {count} arquivo(s) adicionado(s) à fila.")
+                self.py_file_paths.append(file_path)
+            self.file_list.blockSignals(False)
+            self.file_list.setUpdatesEnabled(True)
+            self.file_list.viewport().update()
+            self._ingested_count += len(batch)
+
+        if not self._pending_ingest and self._ingested_count > 0:
+            self.analyze_button.setEnabled(not self.is_processing)
+            self.append_log(f"ℹ️ {self._ingested_count} arquivo(s) adicionado(s) à fila.")
+            self._ingested_count = 0
 
     @pyqtSlot(QListWidgetItem)
     def remove_file_item(self, item):
         path = item.data(Qt.UserRole)
         self.py_file_paths.remove(path)
+        self._paths_seen.discard(path)
         self.list_item_map.pop(path, None)
         self.file_list.takeItem(self.file_list.row(item))
         self.analyze_button.setEnabled(bool(self.py_file_paths))
-        self.results_area.append(f"ℹ️ Arquivo removido da fila: {os.path.basename(path)}")
+        self.append_log(f"ℹ️ Arquivo removido da fila: {display_name(path)}")
         
+    @pyqtSlot()
     def start_analysis(self):
         if not self.py_file_paths:
             QMessageBox.warning(self, "Fila Vazia", "Adicione arquivos para analisar.")
@@ -527,53 +1211,118 @@ class MainWindow(QWidget):
         self.set_ui_processing_state(True)
         self.files_to_process = len(self.py_file_paths)
         self.files_processed = 0
+        self._pending_progress = 0
+        self._rendered_processed = 0
         self.overall_progress_bar.setValue(0)
         
-        self.results_area.clear()
-        self.results_area.append(f"🚀 Iniciando análise de {self.files_to_process} arquivo(s)...")
+        self.clear_log()
+        self.append_log(f"🚀 Iniciando análise de {self.files_to_process} arquivo(s)...")
 
         model = self.model_combo.currentText()
         gen_cfg = configure_generation()
         user_prompt = self.user_prompt_input.toPlainText().strip()
 
+        # Com vários arquivos, o PromptBatcher do dispatcher agrupa os prompts em jobs do Batch Mode;
+        # para um arquivo só, a chamada direta tem latência bem menor.
+        if GEMINI_BATCH_AVAILABLE and self.files_to_process >= CONFIG["BATCH_MIN_FILES"]:
+            self.append_log("📦 Os arquivos serão agrupados em jobs do Batch Mode da Gemini...")
+
+        workers = []
         for file_path in self.py_file_paths:
-            worker = AuditWorker(file_path, model, gen_cfg, user_prompt)
-            worker.signals.finished_file.connect(self.on_worker_finished)
-            worker.signals.error_file.connect(self.on_worker_error)
-            worker.signals.single_file_status.connect(self.update_list_item_status)
-            self.thread_pool.start(worker)
-
-    def on_worker_finished(self, orig_path, report_path, report_title):
-        self.results_area.append(f"✅ Sucesso: '{os.path.basename(orig_path)}'.\n   📄 Relatório salvo em: {report_path}")
-        item = self.list_item_map.get(orig_path)
-        if item:
-            item.setText(f"{os.path.basename(orig_path)} (✅ Concluído)")
-            item.setForeground(QColor("green"))
-        self.update_overall_progress()
+            worker = AuditWorker(file_path, model, gen_cfg, user_prompt, self.audit_cache, self.status_buffer, self.cancel_event)
+            if self.files_to_process == 1:
+                # Com um só arquivo o log mostra a resposta chegando, sem misturar respostas de vários arquivos
+                worker.stream_to_log = True
+                worker.signals.response_chunk.connect(self.on_response_chunk)
+            workers.append(worker)
+        self.dispatcher.submit_all(workers)
+        self._status_timer.start()
+        self._progress_timer.start()
 
-    def on_worker_error(self, orig_path, error_msg):
-        self.results_area.append(f"❌ Erro em '{os.path.basename(orig_path)}': {error_msg}")
-        item = self.list_item_map.get(orig_path)
-        if item:
-            item.setText(f"{os.path.basename(orig_path)} (❌ Erro)")
-            item.setForeground(QColor("red"))
-        self.update_overall_progress()
+    @pyqtSlot(list)
+    def on_results_ready(self, results):
+        for orig_path, report_path, report_title, error_msg in results:
+            self.status_buffer.discard(orig_path)
+            item = self.list_item_map.get(orig_path)
+            if error_msg is None:
+                self.append_log(f"✅ Sucesso: '{display_name(orig_path)}'.\n   📄 Relatório salvo em: {report_path}")
+                if item:
+                    item.setText(f"{display_name(orig_path)} ({_ITEM_DONE})")
+                    item.setForeground(_COLOR_DONE)
+            else:
+                self.append_log(f"❌ Erro em '{display_name(orig_path)}': {error_msg}")
+                if item:
+                    item.setText(f"{display_name(orig_path)} ({_ITEM_ERROR})")
+                    item.setForeground(_COLOR_ERROR)
+        self.update_overall_progress(len(results))
+
+    def append_log(self, message):
+        self._pending_log.append(message)
+        if not self._log_timer.isActive(): self._log_timer.start()
+
+    @pyqtSlot()
+    def flush_log(self):
+        """Insere as linhas pendentes no log com uma única atualização de layout."""
+        self._log_timer.stop()
+        if not self._pending_log: return
+        text = "\n".join(self._pending_log)
+        self._pending_log.clear()
+        self.results_area.appendPlainText(text)
+
+    @pyqtSlot(str, str)
+    def on_response_chunk(self, file_path, text):
+        self._pending_stream.append(text)
+        if not self._stream_timer.isActive(): self._stream_timer.start()
+
+    @pyqtSlot()
+    def flush_stream(self):
+        """Acrescenta ao log os trechos de resposta recebidos desde a última atualização."""
+        self._stream_timer.stop()
+        if not self._pending_stream: return
+        self.flush_log() # Mantém a ordem entre as linhas de log e a resposta
+        text = "".join(self._pending_stream)
+        self._pending_stream.clear()
+        self.results_area.moveCursor(QTextCursor.End)
+        self.results_area.insertPlainText(text)
+
+    def clear_log(self):
+        self._pending_log.clear()
+        self._pending_stream.clear()
+        self._log_timer.stop()
+        self._stream_timer.stop()
+        self.results_area.clear()
 
     def update_list_item_status(self, file_path, status):
         item = self.list_item_map.get(file_path)
         if item:
-            item.setText(f"{os.path.basename(file_path)} ({status})")
+            item.setText(f"{display_name(file_path)} ({status})")
+
+    @pyqtSlot()
+    def flush_file_statuses(self):
+        for file_path, status in self.status_buffer.drain().items():
+            self.update_list_item_status(file_path, status)
     
-    def update_overall_progress(self):
-        self.files_processed += 1
-        progress = int((self.files_processed / self.files_to_process) * 100)
-        self.overall_progress_bar.setValue(progress)
-        self.status_label.setText(f"Processando: {self.files_processed} de {self.files_to_process}")
+    @pyqtSlot()
+    def flush_progress(self):
+        if self._pending_progress != self.overall_progress_bar.value():
+            self.overall_progress_bar.setValue(self._pending_progress)
+        # O rótulo acompanha cada arquivo, mesmo quando a porcentagem inteira não muda (> 100 arquivos)
+        if self.files_processed != self._rendered_processed:
+            self._rendered_processed = self.files_processed
+            self.status_label.setText(_MSG_PROGRESS.format(done=self.files_processed, total=self.files_to_process))
+
+    def update_overall_progress(self, processed=1):
+        self.files_processed += processed
+        self._pending_progress = int((self.files_processed / self.files_to_process) * 100)
 
         if self.files_processed == self.files_to_process:
+            self._status_timer.stop()
+            self._progress_timer.stop()
+            self.flush_progress()
             self.set_ui_processing_state(False)
-            self.status_label.setText("Análise concluída!")
-            self.results_area.append("\n🏁 Análise de todos os arquivos concluída! 🏁")
+            self.status_label.setText(_MSG_DONE)
+            self.append_log("\n🏁 Análise de todos os arquivos concluída! 🏁")
+            self.flush_log()
             QMessageBox.information(self, "Concluído", "A análise de todos os arquivos foi finalizada.")
 
     def set_ui_processing_state(self, is_processing):
@@ -584,61 +1333,97 @@ class MainWindow(QWidget):
         self.clear_button.setEnabled(not is_processing)
         self.user_prompt_input.setReadOnly(is_processing)
         
+        # Exatamente um push do cursor de espera por análise e um restore ao final
         if is_processing:
             self.drop_area.set_style_processing()
-            QApplication.setOverrideCursor(Qt.WaitCursor)
+            if not self._cursor_pushed:
+                QApplication.setOverrideCursor(Qt.WaitCursor)
+                self._cursor_pushed = True
         else:
             self.drop_area.reset_style_idle()
-            QApplication.restoreOverrideCursor()
+            if self._cursor_pushed:
+                QApplication.restoreOverrideCursor()
+                self._cursor_pushed = False
 
+    @pyqtSlot()
     def clear_all(self):
         self.py_file_paths.clear()
-        self.file_list.clear()
+        self._paths_seen.clear()
+        self._pending_ingest.clear()
+        self._ingest_batch.clear()
+        self._ingested_count = 0
+        # Solta os wrappers Python antes que file_list.clear() destrua os itens C++ de uma só vez
         self.list_item_map.clear()
-        self.results_area.clear()
+        self.file_list.clear()
+        self.clear_log()
         self.user_prompt_input.clear()
         self.overall_progress_bar.setValue(0)
-        self.status_label.setText("Pronto para auditar. Adicione arquivos.")
+        self.status_label.setText(_MSG_READY)
         self.analyze_button.setEnabled(False)
 
     def open_file_dialog_from_drop_area(self):
         if self.is_processing: return
-        files, _ = QFileDialog.getOpenFileNames(self, "Selecionar Arquivos Python", "", "Python Files (*.py);;All Files (*)")
-        if files:
-            self.add_files_to_list(files)
+        if self._file_dialog is not None:
+            self._file_dialog.raise_()
+            return
+        # open() em vez de getOpenFileNames(): sem event loop aninhado, a GUI segue processando
+        # os sinais das auditorias e os eventos de arrastar e soltar enquanto o diálogo está aberto.
+        dlg = QFileDialog(self, "Selecionar Arquivos Python", "", "Python Files (*.py);;All Files (*)")
+        dlg.setFileMode(QFileDialog.ExistingFiles)
+        dlg.filesSelected.connect(self.add_files_to_list)
+        dlg.finished.connect(self.on_file_dialog_finished)
+        self._file_dialog = dlg
+        dlg.open()
+
+    @pyqtSlot(int)
+    def on_file_dialog_finished(self, result):
+        dlg, self._file_dialog = self._file_dialog, None
+        if dlg is None: return
+        dlg.filesSelected.disconnect(self.add_files_to_list)
+        dlg.deleteLater()
             
     def closeEvent(self, event):
         if self.is_processing:
             reply = QMessageBox.question(self, 'Sair?', 'Uma análise está em andamento. Deseja realmente sair?',
                                          QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
             if reply == QMessageBox.Yes:
-                self.thread_pool.clear() # Tenta cancelar as tarefas
+                self.shutdown_workers() # Cancela as auditorias em andamento
                 event.accept()
             else:
                 event.ignore()
         else:
+            self.shutdown_workers()
             event.accept()
 
+    def shutdown_workers(self):
+        self.cancel_event.set()
+        self._ingest_executor.shutdown(wait=False, cancel_futures=True)
+        self.dispatcher.stop()
+        self.dispatcher.wait(2000)
+        self.audit_cache.close()
+        close_batch_client()
+
 
 # --- Ponto de Entrada da Aplicação ---
 if __name__ == "__main__":
     try:
+        # Atributos lidos na criação do QApplication: agrupa eventos de alta frequência
+        # (mouse, rolagem, tablet) em vez de acordar o event loop para cada um
+        QApplication.setAttribute(Qt.AA_CompressHighFrequencyEvents, True)
+        QApplication.setAttribute(Qt.AA_CompressTabletEvents, True)
+        QApplication.setAttribute(Qt.AA_UseHighDpiPixmaps, True)
         app = QApplication(sys.argv)
         window = MainWindow()
         window.show()
-        logging.info("Aplicação GUI iniciada.")
+        logger.info("Aplicação GUI iniciada.")
         sys.exit(app.exec_())
     except Exception as e:
-        logging.critical(f"Erro fatal na aplicação: {e}", exc_info=True)
-        print(f"{Fore.RED}ERRO FATAL: {e}{Style.RESET_ALL}")
-        # Tenta mostrar uma caixa de diálogo de erro mesmo em caso de falha grave
-        try:
-            error_box = QMessageBox()
-            error_box.setIcon(QMessageBox.Critical)
-            error_box.setText("Ocorreu um erro fatal e a aplicação precisa ser fechada.")
-            error_box.setInformativeText(str(e))
-            error_box.setWindowTitle("Erro Crítico")
-            error_box.exec_()
-        except:
-            pass
+        logger.critical("Erro fatal na aplicação: %s", e, exc_info=True)
+        sys.stderr.write(f"{Fore.RED}ERRO FATAL: {e}{Style.RESET_ALL}\n")
+        # Só tenta mostrar o diálogo se o QApplication chegou a ser criado (ex.: não falhou o plugin de plataforma)
+        if QApplication.instance() is not None:
+            try:
+                QMessageBox.critical(None, "Erro Crítico", f"Ocorreu um erro fatal e a aplicação precisa ser fechada.\n\n{e}")
+            except Exception as box_e:
+                logger.error("Falha ao exibir o diálogo de erro fatal: %s", box_e)
         sys.exit(1)